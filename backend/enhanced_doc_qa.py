@@ -8,6 +8,7 @@ Always tries to report page count for analytics for all file types.
 """
 
 import os
+import asyncio
 import tempfile
 import shutil
 import subprocess
@@ -99,26 +100,19 @@ def has_visual_metadata_pdf(file_path: str) -> dict:
         
         
         for page_num in range(total_pages):
-            page = doc.load_page(page_num)
-            images = page.get_images()
-            
-            # Check for images in page
-            has_images = len(images) > 0
-            if has_images:
+            # Image XObjects straight from the page resources (no page load/parse)
+            images = doc.get_page_images(page_num)
+            if images:
                 logger.debug(f"Page {page_num} has {len(images)} images")
+                pages_with_visuals.append(page_num)
+                continue
             
-            # Alternative check using page dictionary
-            text_dict = page.get_text("dict")
-            blocks = text_dict.get("blocks", [])
-            
-            # Look for image blocks
-            image_blocks = [b for b in blocks if b.get("type") == 1]  # Type 1 is image
+            # Inline images have no xref; get_image_info finds them without a
+            # full text-dict extraction of the page
+            image_blocks = doc.load_page(page_num).get_image_info()
             if image_blocks:
-                print(f"Page {page_num} has {len(image_blocks)} image blocks")
-
-            if has_images or image_blocks:
-                if page_num not in pages_with_visuals:  # Avoid duplicates
-                    pages_with_visuals.append(page_num)
+                logger.debug(f"Page {page_num} has {len(image_blocks)} image blocks")
+                pages_with_visuals.append(page_num)
                 
         doc.close()
         logger.info(f"Visual content detection complete: {len(pages_with_visuals)} pages have visuals")
@@ -236,11 +230,12 @@ class BatchVLMProcessor:
             #VLM extraction (try/catch)            
             try:    
                                            
+                # Cast pixel values to the model's (possibly reduced) precision
                 inputs = self.vlm_processor(
                     text=vlm_prompt,
                     images=images,
                     return_tensors="pt"
-                ).to(self.device) 
+                ).to(self.device, dtype=self.vlm_model.dtype)
                 print(f"Input tensor shape: {inputs['input_ids'].shape}")
                 with torch.no_grad():
                     print("Starting model generation...")
@@ -774,6 +769,78 @@ class SmartDocumentProcessor:
             except Exception:
                 pass
 
+# ====== PROCESS POOL EXTRACTION WORKER ======
+def cpu_supports_bf16() -> bool:
+    """True if the CPU has native bf16 instructions (AVX512-BF16/AMX on x86, BF16 on Arm)."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpuinfo = f.read()
+    except OSError:
+        return False
+    flags = set()
+    for line in cpuinfo.splitlines():
+        if line.startswith(("flags", "Features")):
+            flags.update(line.split(":", 1)[1].split())
+    return bool(flags & {"avx512_bf16", "amx_bf16", "bf16"})
+
+def get_vlm_dtype(device: torch.device) -> torch.dtype:
+    """VLM weight precision: VLM_DTYPE env override, else fp16 on GPU, bf16 on CPUs with native bf16, fp32 otherwise."""
+    dtypes = {"float32": torch.float32, "float16": torch.float16, "bfloat16": torch.bfloat16}
+    requested = os.getenv("VLM_DTYPE", "auto").lower()
+    if requested in dtypes:
+        return dtypes[requested]
+    if device.type == "cuda":
+        return torch.float16
+    # Without hardware support bf16 is emulated and slower than fp32
+    return torch.bfloat16 if cpu_supports_bf16() else torch.float32
+
+# Models and processor created once per worker process by init_extraction_worker
+_worker_vlm_processor = None
+_worker_vlm_model = None
+_worker_processor = None
+
+def init_extraction_worker(huggingface_key: Optional[str] = None, batch_size: int = 5, max_workers: int = 1):
+    """ProcessPoolExecutor initializer: load the VLM once per worker process."""
+    global _worker_vlm_processor, _worker_vlm_model, _worker_processor
+    try:
+        from transformers import AutoProcessor, AutoModelForVision2Seq
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        _worker_vlm_processor = AutoProcessor.from_pretrained(
+            "HuggingFaceTB/SmolVLM-256M-Instruct",
+            token=huggingface_key
+        )
+        dtype = get_vlm_dtype(device)
+        _worker_vlm_model = AutoModelForVision2Seq.from_pretrained(
+            "HuggingFaceTB/SmolVLM-256M-Instruct",
+            token=huggingface_key,
+            torch_dtype=dtype
+        ).to(device).eval()
+        logger.info(f"✅ VLM models loaded in extraction worker ({dtype})")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load VLM models in extraction worker: {e}")
+        _worker_vlm_processor = None
+        _worker_vlm_model = None
+
+    # Each worker runs one extraction at a time, so the processor can be reused
+    _worker_processor = SmartDocumentProcessor(
+        llm=None,
+        vlm_processor=_worker_vlm_processor,
+        vlm_model=_worker_vlm_model,
+        batch_size=batch_size,
+        max_workers=max_workers
+    )
+
+def extraction_worker_ready() -> bool:
+    """Report whether this worker process has the VLM available."""
+    return _worker_vlm_processor is not None and _worker_vlm_model is not None
+
+def extract_text_in_worker(file_path: str) -> Dict[str, Any]:
+    """Run SmartDocumentProcessor.extract_text_smart inside a worker process."""
+    try:
+        return _worker_processor.extract_text_smart(file_path)
+    finally:
+        _worker_processor.cleanup()
+
 # ====== Paste your InMemoryVectorStore, HallucinationResistantAnswerer, agent functions, and main workflow below ======
 class InMemoryVectorStore:
     """In-memory vector store with session isolation."""
@@ -958,14 +1025,167 @@ class InMemoryVectorStore:
             logger.error(f"Chunk retrieval failed: {e}")
             return []
 
+# Advanced anti-hallucination prompt ({context} and {query} are filled per question)
+ANSWER_PROMPT_TEMPLATE = """You are a precise document analysis assistant. Your task is to answer questions using ONLY the provided context.
+
+CRITICAL RULES:
+1. Use ONLY information from the provided sources below
+2. If the sources don't contain enough information, explicitly state: "The provided sources don't contain sufficient information to answer this question"
+3. Give best answer possible
+4. Never add information from your general knowledge
+5. If uncertain about any part of your answer, state your uncertainty clearly
+6. Provide specific quotes when relevant
+7. Present information in a well-structured format.
+8. For schedules, timelines, or lists, ALWAYS check if there are any missing weeks, days, or entries.
+
+
+SOURCES:
+{context}
+
+QUESTION: {query}
+
+ANALYSIS AND ANSWER (cite sources and be precise):"""
+
+def build_qa_chain(llm):
+    """Compile prompt | llm | parser once per LLM client (LCEL Runnable)."""
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    return PromptTemplate.from_template(ANSWER_PROMPT_TEMPLATE) | llm | StrOutputParser()
+
+class LLMBatcher:
+    """Coalesce concurrent requests into batched async calls on a Runnable (LLM or chain)."""
+
+    def __init__(self, runnable, max_batch: int = 8, max_wait: float = 0.02):
+        self.runnable = runnable
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = None
+        self._worker = None
+        self._inflight = set()
+
+    def start(self):
+        """Start the dispatcher loop (must be called from a running event loop)."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        # Cancel batches still waiting on the model; their futures fail in _dispatch
+        inflight = list(self._inflight)
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        # Fail anything that was queued but never dispatched
+        while not self._queue.empty():
+            self._fail([self._queue.get_nowait()])
+
+    async def submit(self, inputs):
+        """Queue an input (prompt or chain variables) and wait for its response."""
+        if self._worker is None:
+            return await self.runnable.ainvoke(inputs)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((inputs, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # Dispatch without blocking collection of the next batch
+                task = asyncio.create_task(self._dispatch(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+                batch = []
+        except asyncio.CancelledError:
+            # Requests already taken off the queue would otherwise wait forever
+            self._fail(batch)
+            raise
+
+    async def _dispatch(self, batch):
+        inputs = [item for item, _ in batch]
+        try:
+            results = await self.runnable.abatch(inputs, return_exceptions=True)
+        except asyncio.CancelledError:
+            self._fail(batch)
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(batch):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("LLM batcher stopped"))
+
 class HallucinationResistantAnswerer:
     """Answerer with advanced hallucination prevention."""
 
-    def __init__(self, llm):
+    def __init__(self, llm, batcher: Optional[LLMBatcher] = None, chain=None):
         self.llm = llm
+        self.batcher = batcher
+        # Compiled once and reused for every question
+        self.chain = chain or (build_qa_chain(llm) if llm else None)
 
     def generate_answer(self, query: str, context_chunks: List[str]) -> Dict[str, Any]:
         """Generate answer with hallucination prevention techniques."""
+        early = self._early_answer(context_chunks)
+        if early:
+            return early
+
+        context, page_numbers = self._build_context(context_chunks)
+        try:
+            result = self.chain.invoke({"context": context, "query": query})
+            return self._build_result(result, query, context_chunks, context, page_numbers)
+        except Exception as e:
+            logger.error(f"Answer generation failed: {e}")
+            return self._error_result(e)
+
+    async def agenerate_answer(self, query: str, context_chunks: List[str]) -> Dict[str, Any]:
+        """Async generate_answer; goes through the batcher when one is configured."""
+        early = self._early_answer(context_chunks)
+        if early:
+            return early
+
+        context, page_numbers = self._build_context(context_chunks)
+        inputs = {"context": context, "query": query}
+        try:
+            if self.batcher:
+                result = await self.batcher.submit(inputs)
+            else:
+                result = await self.chain.ainvoke(inputs)
+            return self._build_result(result, query, context_chunks, context, page_numbers)
+        except Exception as e:
+            logger.error(f"Answer generation failed: {e}")
+            return self._error_result(e)
+
+    def _early_answer(self, context_chunks: List[dict]) -> Optional[Dict[str, Any]]:
+        """Answers that don't need the LLM (no context / no model)."""
         if not context_chunks:
             return {
                 "answer": "I don't have enough information to answer this question based on the provided document.",
@@ -980,7 +1200,10 @@ class HallucinationResistantAnswerer:
                 "confidence": 0.1,
                 "sources_used": len(context_chunks)
             }
+        return None
 
+    def _build_context(self, context_chunks: List[dict]) -> Tuple[str, List[Any]]:
+        """Return (context, page_numbers) for the anti-hallucination prompt."""
         # Create numbered context
         context = "\n\n".join(
             f"--- PAGE {chunk['page']} ---\n{chunk['content']}"
@@ -996,49 +1219,28 @@ class HallucinationResistantAnswerer:
             }
         )
 
-        # Advanced anti-hallucination prompt
-        enhanced_prompt = f"""You are a precise document analysis assistant. Your task is to answer questions using ONLY the provided context.
+        return context, page_numbers
 
-CRITICAL RULES:
-1. Use ONLY information from the provided sources below
-2. If the sources don't contain enough information, explicitly state: "The provided sources don't contain sufficient information to answer this question"
-3. Give best answer possible
-4. Never add information from your general knowledge
-5. If uncertain about any part of your answer, state your uncertainty clearly
-6. Provide specific quotes when relevant
-7. Present information in a well-structured format.
-8. For schedules, timelines, or lists, ALWAYS check if there are any missing weeks, days, or entries.
+    def _build_result(self, result, query: str, context_chunks: List[dict], context: str, page_numbers: List[Any]) -> Dict[str, Any]:
+        answer = result.content if hasattr(result, 'content') else str(result)
 
+        # Confidence estimation
+        confidence = self._estimate_confidence(answer, context_chunks, query)
 
-SOURCES:
-{context}
-
-QUESTION: {query}
-
-ANALYSIS AND ANSWER (cite sources and be precise):"""
-
-        try:
-            result = self.llm.invoke(enhanced_prompt)
-            answer = result.content if hasattr(result, 'content') else str(result)
-
-            # Confidence estimation
-            confidence = self._estimate_confidence(answer, context_chunks, query)
-
-            return {
-                "answer": answer,
-                "confidence": confidence,
-                "sources_used": len(context_chunks),
-                "sources": page_numbers,
-                "context_length": len(context)
-            }
+        return {
+            "answer": answer,
+            "confidence": confidence,
+            "sources_used": len(context_chunks),
+            "sources": page_numbers,
+            "context_length": len(context)
+        }
 
-        except Exception as e:
-            logger.error(f"Answer generation failed: {e}")
-            return {
-                "answer": f"Error generating answer: {str(e)}",
-                "confidence": 0.0,
-                "sources_used": 0
-            }
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        return {
+            "answer": f"Error generating answer: {str(e)}",
+            "confidence": 0.0,
+            "sources_used": 0
+        }
 
     def _calculate_groundedness(self, answer: str, context_chunks: List[dict]) -> float:
         context_text = " ".join(
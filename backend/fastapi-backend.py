@@ -5,17 +5,24 @@ Maintains exact same functionality as Streamlit version but with REST API endpoi
 """
 
 import os
-import tempfile
-import shutil
+import sys
+import asyncio
+import hashlib
+import json
 import logging
+import time
 import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
@@ -23,10 +30,15 @@ import uvicorn
 
 # Import your existing document processing system
 from enhanced_doc_qa import (
-    SmartDocumentProcessor,
     InMemoryVectorStore, 
-    HallucinationResistantAnswerer
+    HallucinationResistantAnswerer,
+    LLMBatcher,
+    build_qa_chain,
+    init_extraction_worker,
+    extraction_worker_ready,
+    extract_text_in_worker
 )
+from state_store import StateStore
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -38,38 +50,96 @@ logger = logging.getLogger(__name__)
 
 # Global variables for models (will be initialized on startup)
 llm = None
-vlm_processor = None
-vlm_model = None
+qa_chain = None
+llm_batcher = None
+answerer = None
+vlm_loaded = False
 
-# Predefined demo files paths on your backend server
+# Text extraction (incl. VLM inference) runs in separate processes so it never
+# blocks the event loop; each worker process loads its own copy of the VLM
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "1"))
+extraction_executor = None
+
+# Predefined demo files paths on your backend server (all inside demo_files/)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEMO_FILES = {
     "demo_graph": os.path.join(BASE_DIR, "demo_files", "sample w graph.pdf"),
     "demo_data": os.path.join(BASE_DIR, "demo_files", "sampledata.pdf"),
 }
-demo_ingestion_tasks = {}
-
-# Verify demo files exist
-for key, path in DEMO_FILES.items():
-    logger.info(f"{key} at {path}: exists={os.path.exists(path)} size={os.path.getsize(path) if os.path.exists(path) else 'N/A'}")
+# os.stat results for the demo files that exist, filled once at startup
+DEMO_FILE_META: Dict[str, os.stat_result] = {}
+
+# Upload limits (200MB as per UI), streamed in 1MB chunks
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Each upload gets its own {sha256}.{upload_id}{ext} file, removed once extracted;
+# identical content is deduplicated through doc_by_hash, not on disk. Leftovers
+# older than UPLOAD_STALE_SECONDS are removed at startup.
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", os.path.join(BASE_DIR, "uploads")))
+UPLOAD_STALE_SECONDS = 24 * 60 * 60
+
+def prepare_upload_dir():
+    """Create the upload directory and drop files left behind by earlier runs"""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    cutoff = time.time() - UPLOAD_STALE_SECONDS
+    removed = 0
+    with os.scandir(UPLOAD_DIR) as it:
+        for entry in it:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    logger.warning(f"Could not remove stale upload {entry.name}: {e}")
+                    continue
+                removed += 1
+    if removed:
+        logger.info(f"Removed {removed} stale upload(s) from {UPLOAD_DIR}")
+
+def load_demo_file_meta():
+    """Scan the demo directory once and log which demo files are available"""
+    DEMO_FILE_META.clear()
+    demo_dir = os.path.join(BASE_DIR, "demo_files")
+    try:
+        with os.scandir(demo_dir) as it:
+            entries = {entry.name: entry for entry in it if entry.is_file()}
+    except OSError:
+        entries = {}
+    for key, path in DEMO_FILES.items():
+        entry = entries.get(os.path.basename(path))
+        if entry is not None:
+            DEMO_FILE_META[key] = entry.stat()
+    logger.info(
+        "Demo files: " + ", ".join(
+            f"{key}={DEMO_FILE_META[key].st_size}B" if key in DEMO_FILE_META else f"{key}=missing"
+            for key in DEMO_FILES
+        )
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting FastAPI Document Q&A System...")
+    await store.connect()
+    prepare_upload_dir()
+    load_demo_file_meta()
     await load_ai_models()
+    if os.getenv("PRELOAD_DEMO_DOCUMENTS", "false").lower() == "true":
+        preload_demo_documents()
     yield
     # Shutdown
     logger.info("📴 Shutting down FastAPI Document Q&A System...")
     await cleanup_resources()
+    await store.close()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Enhanced Document Q&A System",
     description="FastAPI backend for multi-agent document processing with VLM support",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -81,6 +151,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip that leaves Server-Sent Event streams alone (gzip would buffer events)"""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Compress larger responses (document lists, chat histories)
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=1024)
+
 # Security
 security = HTTPBearer()
 
@@ -100,29 +181,26 @@ class ChatMessage(BaseModel):
     timestamp: str
     confidence: Optional[float] = None
 
-class DocumentInfo(BaseModel):
-    task_id: str
-    filename: str
-    size: int
-    upload_time: str
-    processing_status: str
-    word_count: Optional[int] = None
-    page_count: Optional[int] = None
-    extraction_method: Optional[str] = None
-
-class ProcessingStatus(BaseModel):
-    status: str  # "processing", "completed", "error"
-    progress: float
-    message: str
-    details: Optional[Dict[str, Any]] = None
-
-# In-memory storage (use Redis/Database in production)
-user_sessions = {}
-uploaded_documents = {}
-processing_tasks = {}
+# Sessions, chat history and task status (Redis when REDIS_URL is set)
+store = StateStore()
 
-# Updated for multi-user, multi-chat session storage:
-chat_sessions = {}  # { username: { session_id: [messages] } }
+# Processed documents hold live vectorstore objects, so they stay in-process
+uploaded_documents = {}
+# SHA-256 of file content -> task_id of the processed document
+doc_by_hash = {}
+
+# Demo ingestion tasks share the task store under their own key prefix
+DEMO_TASK_PREFIX = "demo:"
+# Seconds between keepalive comments on an idle status stream
+SSE_KEEPALIVE_INTERVAL = 15
+# Demo documents processed at startup, kept apart from uploaded_documents until
+# someone ingests them through /api/documents/demo_ingest
+demo_documents = {}
+# Demo documents currently being processed, those already requested while a
+# startup preload runs, and startup jobs to cancel on shutdown
+demo_ingestions_running = set()
+demo_ingestions_requested = set()
+background_jobs = set()
 
 # Demo users
 DEMO_USERS = {
@@ -131,9 +209,36 @@ DEMO_USERS = {
 }
 
 # AI Models Loading
+def start_extraction_executor() -> ProcessPoolExecutor:
+    """Start extraction workers; each loads the VLM models in its initializer."""
+    # "spawn" avoids forking a process that already holds torch/CUDA state
+    return ProcessPoolExecutor(
+        max_workers=EXTRACTION_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_extraction_worker,
+        initargs=(os.getenv("HUGGINGFACE_API_KEY"), 5, 1)
+    )
+
+async def run_extraction(file_path: str) -> Dict[str, Any]:
+    """Extract text in the process pool, replacing the pool once if a worker died"""
+    global extraction_executor
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        executor = extraction_executor
+        try:
+            return await loop.run_in_executor(executor, extract_text_in_worker, file_path)
+        except BrokenProcessPool:
+            if attempt:
+                raise
+            logger.error("❌ Extraction worker died, restarting the process pool")
+            # Concurrent tasks see the same broken pool; only the first replaces it
+            if extraction_executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                extraction_executor = start_extraction_executor()
+
 async def load_ai_models():
     """Load AI models with graceful fallback"""
-    global llm, vlm_processor, vlm_model
+    global llm, qa_chain, llm_batcher, answerer, vlm_loaded, extraction_executor
     
     try:
         # Load LLM
@@ -145,31 +250,26 @@ async def load_ai_models():
                 google_api_key=gemini_api_key
             )
             logger.info("✅ Google Gemini LLM loaded successfully")
+
+            # Compile the answer chain once, and coalesce concurrent chat
+            # queries into batched calls on it
+            qa_chain = build_qa_chain(llm)
+            llm_batcher = LLMBatcher(qa_chain, max_batch=8, max_wait=0.02)
+            llm_batcher.start()
         else:
             logger.warning("⚠️ Gemini API key not found")
 
-        # Load VLM models
-        try:
-            from transformers import AutoProcessor, AutoModelForVision2Seq
-            huggingface_key = os.getenv("HUGGINGFACE_API_KEY")
-            
-            vlm_processor = AutoProcessor.from_pretrained(
-                "HuggingFaceTB/SmolVLM-256M-Instruct",
-                token=huggingface_key
-            )
-            import torch
-            device=torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            vlm_model = AutoModelForVision2Seq.from_pretrained(
-                "HuggingFaceTB/SmolVLM-256M-Instruct", 
-                token=huggingface_key
-            )
-            vlm_model = vlm_model.to(device)
-            
+        # Shared across requests (falls back to raw chunks when llm is None)
+        answerer = HallucinationResistantAnswerer(llm=llm, batcher=llm_batcher, chain=qa_chain)
+
+        extraction_executor = start_extraction_executor()
+        # Warm up the pool so models load at startup rather than on first upload
+        loop = asyncio.get_running_loop()
+        vlm_loaded = await loop.run_in_executor(extraction_executor, extraction_worker_ready)
+        if vlm_loaded:
             logger.info("✅ VLM models loaded successfully")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not load VLM models: {e}")
-            vlm_processor = None
-            vlm_model = None
+        else:
+            logger.warning("⚠️ Could not load VLM models, falling back to standard extraction")
 
     except Exception as e:
         logger.error(f"❌ Error loading models: {e}")
@@ -177,13 +277,12 @@ async def load_ai_models():
 
 async def cleanup_resources():
     """Cleanup resources on shutdown"""
-    # Clean up temporary files
-    for session_id, session_data in user_sessions.items():
-        if 'temp_dir' in session_data:
-            try:
-                shutil.rmtree(session_data['temp_dir'])
-            except Exception as e:
-                logger.error(f"Error cleaning up temp dir: {e}")
+    for job in list(background_jobs):
+        job.cancel()
+    if extraction_executor is not None:
+        extraction_executor.shutdown(wait=False, cancel_futures=True)
+    if llm_batcher is not None:
+        await llm_batcher.stop()
 
 # Authentication
 def verify_credentials(username: str, password: str, is_admin: bool = False) -> bool:
@@ -200,24 +299,23 @@ def verify_credentials(username: str, password: str, is_admin: bool = False) ->
     
     return True
 
-def create_session(username: str, is_admin: bool) -> str:
+async def create_session(username: str, is_admin: bool) -> str:
     """Create user session"""
     session_id = str(uuid.uuid4())
-    user_sessions[session_id] = {
+    await store.save_session(session_id, {
         "username": username,
         "is_admin": is_admin,
-        "login_time": datetime.now().isoformat(),
-        "temp_dir": tempfile.mkdtemp(prefix=f"doc_qa_{username}_")
-    }
+        "login_time": datetime.now().isoformat()
+    })
     return session_id
 
-def verify_session(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+async def verify_session(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
     """Verify session token"""
     session_id = credentials.credentials
-    session = user_sessions.get(session_id)
+    session = await store.get_session(session_id)
     if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
-    return session
+    return {"session_id": session_id, **session}
 
 # API Endpoints
 
@@ -228,7 +326,7 @@ async def login(request: LoginRequest):
     if not user or user["password"] != request.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    session_id = create_session(request.username, user["is_admin"] )
+    session_id = await create_session(request.username, user["is_admin"] )
     
     return {
         "access_token": session_id,
@@ -242,20 +340,7 @@ async def login(request: LoginRequest):
 @app.post("/api/auth/logout")
 async def logout(session: Dict[str, Any] = Depends(verify_session)):
     """User logout"""
-    # Find and remove session
-    session_id = None
-    for sid, sess_data in user_sessions.items():
-        if sess_data["username"] == session["username"]:
-            session_id = sid
-            break
-    
-    if session_id:
-        # Cleanup temp directory
-        temp_dir = session.get('temp_dir')
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        
-        del user_sessions[session_id]
+    await store.delete_session(session["session_id"])
     
     return {"message": "Logged out successfully"}
 
@@ -272,50 +357,58 @@ async def get_profile(session: Dict[str, Any] = Depends(verify_session)):
 async def clear_all_chat_history(session: Dict[str, Any] = Depends(verify_session)):
     """Clear all chat histories for the logged-in user."""
     username = session["username"]
-    if username in chat_sessions:
-        del chat_sessions[username]
+    await store.delete_all_chat_history(username)
     return {"message": f"All chat histories cleared for user {username}"}
 
 
-async def process_document(task_id: str, file_path: str, filename: str):
-    """Background task for document processing"""
+async def process_document(task_id: str, file_path: str, filename: str, content_hash: Optional[str] = None,
+                           documents: Optional[Dict[str, Any]] = None):
+    """Background task for document processing; results go into documents (default: uploaded_documents)"""
+    if documents is None:
+        documents = uploaded_documents
     try:
         logger.info(f"process_document called: task_id={task_id}, file_path={file_path}, filename={filename}")
-        processing_tasks[task_id]["status"] = "processing"
-        processing_tasks[task_id]["progress"] = 10.0
-        processing_tasks[task_id]["message"] = "Initializing document processor..."
-        
-        processor = SmartDocumentProcessor(
-            llm=llm,
-            vlm_processor=vlm_processor,
-            vlm_model=vlm_model,
-            batch_size=5,
-            max_workers=1
+        await store.update_task(
+            task_id,
+            status="processing",
+            progress=10.0,
+            message="Initializing document processor..."
         )
         
-        processing_tasks[task_id]["progress"] = 20.0
-        processing_tasks[task_id]["message"] = "Analyzing document structure..."
+        await store.update_task(task_id, progress=20.0, message="Analyzing document structure...")
         
-        extraction_result = processor.extract_text_smart(file_path)
+        try:
+            extraction_result = await run_extraction(file_path)
+        except BrokenProcessPool:
+            await store.update_task(
+                task_id,
+                status="error",
+                message="Extraction failed: the extraction worker crashed (file may be too large)"
+            )
+            return
         
         if not extraction_result["success"]:
-            processing_tasks[task_id]["status"] = "error"
-            processing_tasks[task_id]["message"] = f"Extraction failed: {extraction_result.get('error', 'Unknown error')}"
+            await store.update_task(
+                task_id,
+                status="error",
+                message=f"Extraction failed: {extraction_result.get('error', 'Unknown error')}"
+            )
             return
         
-        processing_tasks[task_id]["progress"] = 60.0
-        processing_tasks[task_id]["message"] = "Creating vector store..."
+        await store.update_task(task_id, progress=60.0, message="Creating vector store...")
         
         vectorstore = InMemoryVectorStore(session_id=task_id)
-        vs_result = vectorstore.create_vectorstore(extraction_result["text"])
+        vs_result = await asyncio.to_thread(vectorstore.create_vectorstore, extraction_result["text"])
         
         if not vs_result["success"]:
-            processing_tasks[task_id]["status"] = "error"
-            processing_tasks[task_id]["message"] = f"Vector store creation failed: {vs_result.get('error', 'Unknown error')}"
+            await store.update_task(
+                task_id,
+                status="error",
+                message=f"Vector store creation failed: {vs_result.get('error', 'Unknown error')}"
+            )
             return
         
-        processing_tasks[task_id]["progress"] = 90.0
-        processing_tasks[task_id]["message"] = "Finalizing..."
+        await store.update_task(task_id, progress=90.0, message="Finalizing...")
         
         doc_info = {
             "filename": filename,
@@ -327,27 +420,60 @@ async def process_document(task_id: str, file_path: str, filename: str):
             "page_count": extraction_result.get("pages", 1),
             "extraction_method": extraction_result.get("extraction_method", "unknown"),
             "vectorstore": vectorstore,
-            "chunk_count": vs_result["chunk_count"]
-        }
-        
-        uploaded_documents[task_id] = doc_info
-        
-        processing_tasks[task_id]["status"] = "completed"
-        processing_tasks[task_id]["progress"] = 100.0
-        processing_tasks[task_id]["message"] = "Document processing completed successfully!"
-        processing_tasks[task_id]["details"] = {
-            "word_count": extraction_result.get("word_count", 0),
-            "page_count": extraction_result.get("pages", 1),
             "chunk_count": vs_result["chunk_count"],
-            "extraction_method": extraction_result.get("extraction_method", "unknown")
+            "content_hash": content_hash
         }
         
-        processor.cleanup()
+        replaced = task_id in documents
+        documents[task_id] = doc_info
+        if content_hash:
+            doc_by_hash[content_hash] = task_id
+        # Re-ingesting under the same id replaces the content; demo ids are reused
+        # across restarts, so Redis may still hold their answers. Uploads get fresh ids.
+        if replaced or task_id in DEMO_FILES:
+            await store.invalidate_answers(task_id)
+        
+        await store.update_task(
+            task_id,
+            status="completed",
+            progress=100.0,
+            message="Document processing completed successfully!",
+            details={
+                "word_count": extraction_result.get("word_count", 0),
+                "page_count": extraction_result.get("pages", 1),
+                "chunk_count": vs_result["chunk_count"],
+                "extraction_method": extraction_result.get("extraction_method", "unknown")
+            }
+        )
         
     except Exception as e:
         logger.error(f"Document processing error: {e}")
-        processing_tasks[task_id]["status"] = "error" 
-        processing_tasks[task_id]["message"] = f"Processing error: {str(e)}"
+        await store.update_task(task_id, status="error", message=f"Processing error: {str(e)}")
+
+
+async def process_upload(task_id: str, file_path: str, filename: str, content_hash: str):
+    """Process an uploaded file, then remove it; the text lives in the vector store"""
+    try:
+        await process_document(task_id, file_path, filename, content_hash)
+    finally:
+        Path(file_path).unlink(missing_ok=True)
+
+
+async def mark_document_completed(task_id: str, message: str):
+    """Refresh the completed status of an already processed document that is being reused"""
+    doc_info = uploaded_documents[task_id]
+    await store.update_task(
+        task_id,
+        status="completed",
+        progress=100.0,
+        message=message,
+        details={
+            "word_count": doc_info["word_count"],
+            "page_count": doc_info["page_count"],
+            "chunk_count": doc_info["chunk_count"],
+            "extraction_method": doc_info["extraction_method"]
+        }
+    )
 
 
 @app.post("/api/documents/upload")
@@ -366,38 +492,60 @@ async def upload_document(
     if file_ext not in ['.pdf', '.docx', '.txt']:
         raise HTTPException(status_code=400, detail="Unsupported file format")
     
-    # Check file size (200MB limit as per UI)
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > 200 * 1024 * 1024:  # 200MB
-        raise HTTPException(status_code=413, detail="File too large (max 200MB)")
-    
-    # Save file
-    temp_dir = session.get('temp_dir')
-    if not temp_dir:
-        temp_dir = tempfile.mkdtemp(prefix=f"doc_qa_{session['username']}_")
-        session['temp_dir'] = temp_dir
+    # Stream to a partial file in chunks, enforcing the size limit and hashing as bytes arrive
+    upload_id = uuid.uuid4().hex
+    partial_path = UPLOAD_DIR / f"{upload_id}.part"
+    file_size = 0
+    hasher = hashlib.sha256()
+    try:
+        with open(partial_path, 'wb') as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > MAX_UPLOAD_SIZE:
+                    raise HTTPException(status_code=413, detail="File too large (max 200MB)")
+                hasher.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        # Size limit, write errors and client disconnects leave no partial file behind
+        partial_path.unlink(missing_ok=True)
+        raise
+    content_hash = hasher.hexdigest()
     
-    file_path = Path(temp_dir) / file.filename
+    # Identical content was already processed: reuse it instead of re-running the pipeline
+    existing_id = doc_by_hash.get(content_hash)
+    if existing_id in uploaded_documents:
+        partial_path.unlink(missing_ok=True)
+        await mark_document_completed(existing_id, "Document already processed")
+        return {
+            "task_id": existing_id,
+            "message": "Document already processed",
+            "filename": file.filename,
+            "size": file_size,
+            "cached": True
+        }
     
-    with open(file_path, 'wb') as f:
-        f.write(content)
+    # Unique per upload, so no other task or worker can replace or remove it
+    file_path = UPLOAD_DIR / f"{content_hash}.{upload_id}{file_ext}"
+    os.replace(partial_path, file_path)
     
     # Create processing task
     task_id = str(uuid.uuid4())
-    processing_tasks[task_id] = {
-        "status": "processing",
-        "progress": 0.0,
-        "message": "Starting document processing...",
-        "file_path": str(file_path),
-        "filename": file.filename,
-        "session_id": session.get("session_id", "unknown"),
-        "start_time": datetime.now().isoformat()
-    }
+    await store.update_task(
+        task_id,
+        status="processing",
+        progress=0.0,
+        message="Starting document processing...",
+        file_path=str(file_path),
+        filename=file.filename,
+        session_id=session.get("session_id", "unknown"),
+        start_time=datetime.now().isoformat()
+    )
     
     # Start background processing
-    background_tasks.add_task(process_document, task_id, str(file_path), file.filename)
+    background_tasks.add_task(process_upload, task_id, str(file_path), file.filename, content_hash)
     
     return {
         "task_id": task_id,
@@ -410,44 +558,93 @@ async def upload_document(
 async def get_processing_status(task_id: str):
     """Get document processing status for regular and demo ingestion tasks"""
     
-    task = processing_tasks.get(task_id)
+    task = await store.get_task(task_id)
     if task:
-        return ProcessingStatus(
-            status=task["status"],
-            progress=task.get("progress", 0),
-            message=task.get("message", ""),
-            details=task.get("details"),
-        )
+        return processing_status_payload(task)
     
     # Check demo ingestion tasks
-    demo_task = demo_ingestion_tasks.get(task_id)
+    demo_task = await store.get_task(DEMO_TASK_PREFIX + task_id)
     if demo_task:
-        return ProcessingStatus(
-            status=demo_task["status"],
-            progress=100 if demo_task["status"] == "completed" else 0,
-            message=demo_task.get("message", ""),
-            details=demo_task.get("details"),
-        )
+        return processing_status_payload(demo_task, demo=True)
     
     raise HTTPException(status_code=404, detail="Task not found")
 
+@app.get("/api/documents/processing-status/{task_id}/stream")
+async def stream_processing_status(task_id: str):
+    """Push processing status updates as Server-Sent Events until the task finishes"""
+    
+    if not await store.get_task(task_id) and not await store.get_task(DEMO_TASK_PREFIX + task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    async def event_generator():
+        updates = store.watch_task(task_id)
+        next_update = None
+        try:
+            while True:
+                if next_update is None:
+                    next_update = asyncio.ensure_future(updates.__anext__())
+                # Don't cancel the pending read on timeout; that would close the watcher
+                done, _ = await asyncio.wait({next_update}, timeout=SSE_KEEPALIVE_INTERVAL)
+                if not done:
+                    # SSE comment line so proxies don't drop an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                try:
+                    task = next_update.result()
+                except StopAsyncIteration:
+                    break
+                next_update = None
+                if not task or "status" not in task:
+                    # Demo ingestion registered but processing not started yet
+                    continue
+                payload = processing_status_payload(task)
+                yield f"data: {json.dumps(payload)}\n\n"
+                if payload["status"] in ("completed", "error"):
+                    break
+        finally:
+            # Unregister the watcher as soon as we stop reading
+            if next_update is not None and not next_update.done():
+                next_update.cancel()
+                await asyncio.wait({next_update})
+            await updates.aclose()
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def processing_status_payload(task: Dict[str, Any], demo: bool = False) -> Dict[str, Any]:
+    """Status fields sent to the client for a processing task"""
+    if demo:
+        progress = 100.0 if task["status"] == "completed" else 0.0
+    else:
+        progress = float(task.get("progress", 0))
+    return {
+        "status": task["status"],
+        "progress": progress,
+        "message": task.get("message", ""),
+        "details": task.get("details"),
+    }
+
 
 @app.get("/api/documents/list")
 async def list_documents(session: Dict[str, Any] = Depends(verify_session)):
     """List uploaded documents"""
     
-    documents = []
-    for doc_id, doc_info in uploaded_documents.items():
-        documents.append(DocumentInfo(
-            task_id=doc_id,
-            filename=doc_info["filename"],
-            size=doc_info["size"],
-            upload_time=doc_info["upload_time"],
-            processing_status=doc_info["processing_status"],
-            word_count=doc_info.get("word_count"),
-            page_count=doc_info.get("page_count"),
-            extraction_method=doc_info.get("extraction_method")
-        ))
+    documents = [
+        {
+            "task_id": doc_id,
+            "filename": doc_info["filename"],
+            "size": doc_info["size"],
+            "upload_time": doc_info["upload_time"],
+            "processing_status": doc_info["processing_status"],
+            "word_count": doc_info.get("word_count"),
+            "page_count": doc_info.get("page_count"),
+            "extraction_method": doc_info.get("extraction_method")
+        }
+        for doc_id, doc_info in uploaded_documents.items()
+    ]
     
     return {"documents": documents}
 
@@ -459,6 +656,7 @@ async def set_active_document(document_id: str, session: Dict[str, Any] = Depend
 
     # Store active document id in user session data
     session["active_document_id"] = document_id
+    await store.save_session(session["session_id"], session)
 
     # Potentially record active doc elsewhere or update flags as needed
 
@@ -472,61 +670,67 @@ async def query_document(request: QueryRequest, session: Dict[str, Any] = Depend
     if not uploaded_documents:
         raise HTTPException(status_code=400, detail="No documents uploaded. Please upload a document first.")
 
-    doc_info = None
-    if request.document_id and request.document_id in uploaded_documents:
-        doc_info = uploaded_documents[request.document_id]
+    if request.document_id:
+        if request.document_id not in uploaded_documents:
+            raise HTTPException(status_code=404, detail="Document not found")
+        doc_id = request.document_id
     else:
         doc_id = list(uploaded_documents.keys())[0]
-        doc_info = uploaded_documents[doc_id]
+    doc_info = uploaded_documents[doc_id]
 
     if doc_info["processing_status"] != "completed":
         raise HTTPException(status_code=400, detail="Document is still being processed")
 
     try:
-        vectorstore = doc_info["vectorstore"]
-        chunks = vectorstore.retrieve_chunks(request.query, k=6)
-
-        if not chunks:
-            answer = "I couldn't find relevant information in the document to answer your question."
-            confidence = 0.1
-            sources_used = 0
-        else:
-            answerer = HallucinationResistantAnswerer(llm=llm)
-            answer_result = answerer.generate_answer(request.query, chunks)
-            answer = answer_result["answer"]
-            confidence = answer_result["confidence"]
-            sources_used = answer_result["sources_used"]
-            sources = answer_result.get("sources", [])
-
-        if username not in chat_sessions:
-            chat_sessions[username] = {}
-
-        if request.session_id not in chat_sessions[username]:
-            chat_sessions[username][request.session_id] = []
-
-        # Append user message
-        chat_sessions[username][request.session_id].append({
-            "role": "user",
-            "content": request.query,
-            "timestamp": datetime.now().isoformat(),
-        })
-        # Append assistant response
-        chat_sessions[username][request.session_id].append({
-            "role": "assistant",
-            "content": answer,
-            "confidence": confidence,
-            "sources_used": sources_used,
-            "sources": sources,
-            "timestamp": datetime.now().isoformat(),
-        })
-
-        return {
-            "answer": answer,
-            "confidence": confidence,
-            "sources_used": sources_used,
-            "sources": sources,
-            "chunks_retrieved": len(chunks),
-        }
+        # Repeated questions on the same document skip retrieval and the LLM
+        result = await store.get_cached_answer(doc_id, request.query)
+        writes = []
+        if result is None:
+            vectorstore = doc_info["vectorstore"]
+            chunks = await asyncio.to_thread(vectorstore.retrieve_chunks, request.query, k=6)
+
+            if not chunks:
+                result = {
+                    "answer": "I couldn't find relevant information in the document to answer your question.",
+                    "confidence": 0.1,
+                    "sources_used": 0,
+                    "sources": [],
+                    "chunks_retrieved": 0,
+                }
+            else:
+                answer_result = await answerer.agenerate_answer(request.query, chunks)
+                result = {
+                    "answer": answer_result["answer"],
+                    "confidence": answer_result["confidence"],
+                    "sources_used": answer_result["sources_used"],
+                    "sources": answer_result.get("sources", []),
+                    "chunks_retrieved": len(chunks),
+                }
+                # Only cache real LLM answers, not fallbacks or errors
+                if "sources" in answer_result:
+                    writes.append(store.cache_answer(doc_id, request.query, result))
+
+        # Cache fill and chat history are independent writes; run them together
+        writes.append(store.append_chat_messages(username, request.session_id, [
+            # User message
+            {
+                "role": "user",
+                "content": request.query,
+                "timestamp": datetime.now().isoformat(),
+            },
+            # Assistant response
+            {
+                "role": "assistant",
+                "content": result["answer"],
+                "confidence": result["confidence"],
+                "sources_used": result["sources_used"],
+                "sources": result["sources"],
+                "timestamp": datetime.now().isoformat(),
+            },
+        ]))
+        await asyncio.gather(*writes)
+
+        return result
     except Exception as e:
         logger.error(f"Query processing error: {e}")
         raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
@@ -535,33 +739,31 @@ async def query_document(request: QueryRequest, session: Dict[str, Any] = Depend
 async def get_chat_history(session_id: str, session: Dict[str, Any] = Depends(verify_session)):
     """Return chat messages for specific user and session_id."""
     username = session["username"]
-    user_chats = chat_sessions.get(username, {})
-    history = user_chats.get(session_id, [])
+    history = await store.get_chat_history(username, session_id)
     return {"history": history}
 
 @app.get("/api/chat/sessions")
 async def get_chat_sessions(session: Dict[str, Any] = Depends(verify_session)):
     """List all chat sessions metadata for the logged-in user."""
     username = session["username"]
-    user_chats = chat_sessions.get(username, {})
-    sessions_list = []
-    for ses_id, messages in user_chats.items():
-        last_msg = messages[-1] if messages else {}
-        sessions_list.append({
-            "sessionId": ses_id,
-            "lastMessage": last_msg.get("content", ""),
-            "lastTimestamp": last_msg.get("timestamp", ""),
-            "messageCount": len(messages)
-        })
-    sessions_list.sort(key=lambda x: x["lastTimestamp"], reverse=True)
+    # Already ordered by last activity, most recent first
+    summaries = await store.list_chat_sessions(username)
+    sessions_list = [
+        {
+            "sessionId": summary["session_id"],
+            "lastMessage": summary["last_message"],
+            "lastTimestamp": summary["last_timestamp"],
+            "messageCount": summary["message_count"]
+        }
+        for summary in summaries
+    ]
     return {"sessions": sessions_list}
 
 @app.delete("/api/chat/history/{session_id}")
 async def clear_chat_history(session_id: str, session: Dict[str, Any] = Depends(verify_session)):
     """Clear chat history for specific user+session."""
     username = session["username"]
-    if username in chat_sessions and session_id in chat_sessions[username]:
-        del chat_sessions[username][session_id]
+    await store.delete_chat_history(username, session_id)
     return {"message": "Chat history cleared"}
 
 @app.get("/api/system/status")
@@ -572,11 +774,11 @@ async def get_system_status(session: Dict[str, Any] = Depends(verify_session)):
     return {
         "system_health": "Healthy",
         "documents_processed": len(uploaded_documents),
-        "active_sessions": len(user_sessions),
+        "active_sessions": await store.count_sessions(),
         "models_loaded": {
             "llm": llm is not None,
-            "vlm_processor": vlm_processor is not None,
-            "vlm_model": vlm_model is not None
+            "vlm_processor": vlm_loaded,
+            "vlm_model": vlm_loaded
         }
     }
 
@@ -592,7 +794,7 @@ async def health_check():
 # Exception handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail, "status_code": exc.status_code}
     )
@@ -600,66 +802,116 @@ async def http_exception_handler(request, exc):
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"error": "Internal server error", "status_code": 500}
     )
 
 @app.post("/api/documents/demo_ingest/{task_id}")
 async def demo_ingest_document(task_id: str, background_tasks: BackgroundTasks, session: dict = Depends(verify_session)):
-    if task_id not in DEMO_FILES:
+    if task_id not in DEMO_FILE_META:
         raise HTTPException(status_code=404, detail="Demo document not found")
     
     # Generate unique ingestion ID for task tracking
     file_path = DEMO_FILES[task_id]
     ingestion_id = task_id
     
+    # Demo files never change: reuse the copy processed earlier or at startup
+    if ingestion_id not in uploaded_documents and ingestion_id in demo_documents:
+        uploaded_documents[ingestion_id] = demo_documents[ingestion_id]
+    if ingestion_id in uploaded_documents:
+        await mark_document_completed(ingestion_id, "Document processing completed successfully!")
+        await store.update_task(
+            DEMO_TASK_PREFIX + ingestion_id,
+            status="completed",
+            message="Demo ingestion completed"
+        )
+        return {"message": "Demo document already ingested", "task_id": ingestion_id}
+    
+    if ingestion_id in demo_ingestions_running:
+        # A startup preload picks this up when it finishes
+        demo_ingestions_requested.add(ingestion_id)
+        return {"message": "Demo ingestion already in progress", "task_id": ingestion_id}
 
     # Track ingestion task
-    demo_ingestion_tasks[ingestion_id] = {
-        "status": "processing",
-        "file_path": file_path,
-        "start_time": datetime.now().isoformat(),
-        "message": "Starting demo ingestion"
-    }
+    await store.update_task(
+        DEMO_TASK_PREFIX + ingestion_id,
+        status="processing",
+        file_path=file_path,
+        start_time=datetime.now().isoformat(),
+        message="Starting demo ingestion"
+    )
 
     # Start actual ingestion in background
+    demo_ingestions_running.add(ingestion_id)
+    demo_ingestions_requested.add(ingestion_id)
     background_tasks.add_task(perform_demo_ingestion, ingestion_id, file_path, task_id)
 
     return {"message": "Demo ingestion started", "task_id": ingestion_id}
 
 
 async def perform_demo_ingestion(ingestion_id: str, file_path: str, task_id:str):
+    """Process a demo file into demo_documents; publish it if someone asked for it"""
     logger.info(f"Starting demo ingestion: task_id={task_id}, file_path={file_path}, filename={os.path.basename(file_path)}")
-    processing_tasks[ingestion_id] = {
-        "status": "processing",
-        "progress": 0.0,
-        "message": "Starting document processing...",
-        "file_path": file_path,
-        "filename": os.path.basename(file_path),
-        "session_id": None,
-        "start_time": datetime.now().isoformat()
-    }
+    await store.update_task(
+        ingestion_id,
+        status="processing",
+        progress=0.0,
+        message="Starting document processing...",
+        file_path=file_path,
+        filename=os.path.basename(file_path),
+        session_id=None,
+        start_time=datetime.now().isoformat()
+    )
     
     try:
-        # Await processing (which updates processing_tasks and uploaded_documents)
-        await process_document(ingestion_id, file_path, os.path.basename(file_path))  # Reuse your existing processing method
+        # Await processing (which updates the task store and demo_documents)
+        await process_document(ingestion_id, file_path, os.path.basename(file_path), documents=demo_documents)
+        if ingestion_id not in demo_ingestions_requested:
+            return  # startup preload nobody has asked for yet
+        if ingestion_id not in demo_documents:
+            raise RuntimeError("document processing failed")
+        uploaded_documents[ingestion_id] = demo_documents[ingestion_id]
 
         # After processing, assign metadata as needed
-        demo_ingestion_tasks[ingestion_id]["status"] = "completed"
-        demo_ingestion_tasks[ingestion_id]["message"] = "Demo ingestion completed"
+        await store.update_task(
+            DEMO_TASK_PREFIX + ingestion_id,
+            status="completed",
+            message="Demo ingestion completed"
+        )
 
     except Exception as e:
         logger.error(f"Demo ingestion error: {e}")
-        demo_ingestion_tasks[ingestion_id]["status"] = "error"
-        demo_ingestion_tasks[ingestion_id]["message"] = f"Demo ingestion failed: {str(e)}"
+        if ingestion_id in demo_ingestions_requested:
+            await store.update_task(
+                DEMO_TASK_PREFIX + ingestion_id,
+                status="error",
+                message=f"Demo ingestion failed: {str(e)}"
+            )
+    finally:
+        demo_ingestions_running.discard(ingestion_id)
+        demo_ingestions_requested.discard(ingestion_id)
+
+
+def preload_demo_documents():
+    """Process every available demo file once in the background at startup"""
+    for key in DEMO_FILE_META:
+        demo_ingestions_running.add(key)
+        job = asyncio.create_task(perform_demo_ingestion(key, DEMO_FILES[key], key))
+        background_jobs.add(job)
+        job.add_done_callback(background_jobs.discard)
 
-# Development server entrypoint
+# Server entrypoint: auto-reload in development. Always a single worker, since
+# processed documents live in this process; scale out with separate instances.
 if __name__ == "__main__":
+    is_development = os.getenv("ENVIRONMENT", "development") == "development"
     uvicorn.run(
         "fastapi-backend:app",
         host="0.0.0.0", 
-        port=8000,
-        reload=True,
+        port=int(os.getenv("PORT", "8000")),
+        reload=is_development,
+        # uvloop has no Windows build; uvicorn falls back to asyncio there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         log_level="info"
     )
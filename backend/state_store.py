@@ -0,0 +1,290 @@
+"""
+Shared state storage for the FastAPI backend.
+
+Sessions, chat history and processing-task status live in Redis when REDIS_URL
+is configured, so every uvicorn worker sees the same state. Without Redis the
+store falls back to plain in-process dicts (single worker only).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple, Set
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL = 24 * 60 * 60       # 1 day
+TASK_TTL = 24 * 60 * 60          # 1 day
+CHAT_TTL = 7 * 24 * 60 * 60      # 1 week
+ANSWER_TTL = 60 * 60             # 1 hour
+CHAT_HISTORY_LIMIT = 500         # messages kept per chat
+ANSWER_CACHE_SIZE = 1024         # per-process LRU entries
+
+
+class StateStore:
+    """Key/value state backed by Redis, with an in-memory fallback."""
+
+    def __init__(self):
+        self.redis = None
+        # In-memory fallback storage
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.chats: Dict[str, Dict[str, deque]] = {}  # { username: { session_id: deque(messages) } }
+        # { username: { session_id: summary } }, least to most recently active
+        self.chat_index: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.task_listeners: Dict[str, Set[asyncio.Queue]] = {}
+        # Per-process LRU in front of Redis for cached answers: key -> (expires_at, result)
+        self.answers: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def connect(self, redis_url: Optional[str] = None):
+        """Connect to Redis if a URL is configured, otherwise stay in-memory"""
+        redis_url = redis_url or os.getenv("REDIS_URL")
+        if not redis_url:
+            logger.info("ℹ️ REDIS_URL not set, using in-memory state store")
+            return
+
+        # A configured but unreachable Redis is a deployment error: workers would
+        # silently diverge on in-memory state, so fail startup instead
+        try:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(redis_url, decode_responses=True)
+            await client.ping()
+        except Exception as e:
+            logger.error(f"❌ Could not connect to Redis at REDIS_URL: {e}")
+            raise RuntimeError("REDIS_URL is set but Redis is unreachable") from e
+        self.redis = client
+        logger.info("✅ Connected to Redis state store")
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+    # ====== SESSIONS ======
+
+    async def save_session(self, session_id: str, data: Dict[str, Any]):
+        if self.redis is not None:
+            await self.redis.setex(f"sess:{session_id}", SESSION_TTL, json.dumps(data))
+        else:
+            self.sessions[session_id] = data
+
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if self.redis is not None:
+            raw = await self.redis.get(f"sess:{session_id}")
+            return json.loads(raw) if raw else None
+        return self.sessions.get(session_id)
+
+    async def delete_session(self, session_id: str):
+        if self.redis is not None:
+            await self.redis.delete(f"sess:{session_id}")
+        else:
+            self.sessions.pop(session_id, None)
+
+    async def count_sessions(self) -> int:
+        if self.redis is not None:
+            count = 0
+            async for _ in self.redis.scan_iter(match="sess:*"):
+                count += 1
+            return count
+        return len(self.sessions)
+
+    # ====== CHAT HISTORY ======
+    # Each chat is a message list chat:{user}:{session} (last CHAT_HISTORY_LIMIT
+    # messages) plus a summary hash chatmeta:{user}:{session}; per user, a sorted
+    # set chatidx:{user} scored by last activity keeps chats ordered. The prefixes
+    # are disjoint so no client-chosen session_id can land on another key.
+
+    async def append_chat_messages(self, username: str, session_id: str, messages: List[Dict[str, Any]]):
+        last_msg = messages[-1]
+        if self.redis is not None:
+            key = f"chat:{username}:{session_id}"
+            meta_key = f"chatmeta:{username}:{session_id}"
+            index_key = f"chatidx:{username}"
+            # One round trip for the whole update
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.rpush(key, *(json.dumps(m) for m in messages))
+            pipe.ltrim(key, -CHAT_HISTORY_LIMIT, -1)
+            pipe.hset(meta_key, mapping={
+                "last_message": last_msg.get("content", ""),
+                "last_timestamp": last_msg.get("timestamp", ""),
+            })
+            pipe.zadd(index_key, {session_id: time.time()})
+            for k in (key, meta_key, index_key):
+                pipe.expire(k, CHAT_TTL)
+            await pipe.execute()
+        else:
+            history = self.chats.setdefault(username, {}).setdefault(
+                session_id, deque(maxlen=CHAT_HISTORY_LIMIT)
+            )
+            history.extend(messages)
+            index = self.chat_index.setdefault(username, OrderedDict())
+            index[session_id] = {
+                "session_id": session_id,
+                "last_message": last_msg.get("content", ""),
+                "last_timestamp": last_msg.get("timestamp", ""),
+                "message_count": len(history),
+            }
+            index.move_to_end(session_id)
+
+    async def get_chat_history(self, username: str, session_id: str) -> List[Dict[str, Any]]:
+        if self.redis is not None:
+            raw = await self.redis.lrange(f"chat:{username}:{session_id}", 0, -1)
+            return [json.loads(m) for m in raw]
+        return list(self.chats.get(username, {}).get(session_id, []))
+
+    async def list_chat_sessions(self, username: str) -> List[Dict[str, Any]]:
+        """Chat summaries for a user, most recently active first"""
+        if self.redis is not None:
+            session_ids = await self.redis.zrevrange(f"chatidx:{username}", 0, -1)
+            pipe = self.redis.pipeline(transaction=False)
+            for ses_id in session_ids:
+                pipe.hgetall(f"chatmeta:{username}:{ses_id}")
+                pipe.llen(f"chat:{username}:{ses_id}")
+            results = await pipe.execute() if session_ids else []
+            return [
+                {
+                    "session_id": ses_id,
+                    "last_message": meta.get("last_message", ""),
+                    "last_timestamp": meta.get("last_timestamp", ""),
+                    "message_count": count,
+                }
+                for ses_id, meta, count in zip(session_ids, results[::2], results[1::2])
+                if meta
+            ]
+        index = self.chat_index.get(username, {})
+        return [dict(summary) for summary in reversed(index.values())]
+
+    async def delete_chat_history(self, username: str, session_id: str):
+        if self.redis is not None:
+            await self.redis.delete(f"chat:{username}:{session_id}", f"chatmeta:{username}:{session_id}")
+            await self.redis.zrem(f"chatidx:{username}", session_id)
+        else:
+            self.chats.get(username, {}).pop(session_id, None)
+            self.chat_index.get(username, {}).pop(session_id, None)
+
+    async def delete_all_chat_history(self, username: str):
+        if self.redis is not None:
+            index_key = f"chatidx:{username}"
+            session_ids = await self.redis.zrange(index_key, 0, -1)
+            keys = []
+            for ses_id in session_ids:
+                keys += [f"chat:{username}:{ses_id}", f"chatmeta:{username}:{ses_id}"]
+            await self.redis.delete(index_key, *keys)
+        else:
+            self.chats.pop(username, None)
+            self.chat_index.pop(username, None)
+
+    # ====== PROCESSING TASKS ======
+
+    async def update_task(self, task_id: str, **fields):
+        """Create or update fields of a processing task and notify watchers"""
+        if self.redis is not None:
+            key = f"task:{task_id}"
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping={k: json.dumps(v) for k, v in fields.items()})
+            pipe.expire(key, TASK_TTL)
+            pipe.publish(f"{key}:events", json.dumps(fields))
+            await pipe.execute()
+        else:
+            self.tasks.setdefault(task_id, {}).update(fields)
+            for queue in self.task_listeners.get(task_id, ()):
+                queue.put_nowait(fields)
+
+    async def watch_task(self, task_id: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the task's current state (None if not created yet), then again after every update"""
+        if self.redis is not None:
+            pubsub = self.redis.pubsub()
+            # Subscribe before reading the snapshot so no update is missed
+            await pubsub.subscribe(f"task:{task_id}:events")
+            try:
+                task = await self.get_task(task_id)
+                yield task
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    task = {**(task or {}), **json.loads(message["data"])}
+                    yield task
+            finally:
+                # aclose() unsubscribes and releases the connection
+                await pubsub.aclose()
+        else:
+            queue: asyncio.Queue = asyncio.Queue()
+            self.task_listeners.setdefault(task_id, set()).add(queue)
+            try:
+                task = await self.get_task(task_id)
+                yield task
+                while True:
+                    fields = await queue.get()
+                    task = {**(task or {}), **fields}
+                    yield task
+            finally:
+                listeners = self.task_listeners.get(task_id)
+                if listeners is not None:
+                    listeners.discard(queue)
+                    if not listeners:
+                        del self.task_listeners[task_id]
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        if self.redis is not None:
+            raw = await self.redis.hgetall(f"task:{task_id}")
+            return {k: json.loads(v) for k, v in raw.items()} if raw else None
+        task = self.tasks.get(task_id)
+        return dict(task) if task else None
+
+    # ====== ANSWER CACHE ======
+    # Answers live under qa:{document_id}:{digest}; the qa:{document_id}:keys set
+    # tracks them so a document's answers can be dropped without a SCAN.
+
+    @staticmethod
+    def _answer_key(document_id: str, query: str) -> str:
+        digest = hashlib.sha256(query.strip().lower().encode("utf-8")).hexdigest()
+        return f"qa:{document_id}:{digest}"
+
+    async def get_cached_answer(self, document_id: str, query: str) -> Optional[Dict[str, Any]]:
+        key = self._answer_key(document_id, query)
+        entry = self.answers.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self.answers.move_to_end(key)
+                return dict(result)
+            del self.answers[key]
+        if self.redis is not None:
+            raw = await self.redis.get(key)
+            if raw:
+                result = json.loads(raw)
+                self._remember_answer(key, result)
+                return result
+        return None
+
+    async def cache_answer(self, document_id: str, query: str, result: Dict[str, Any]):
+        key = self._answer_key(document_id, query)
+        self._remember_answer(key, result)
+        if self.redis is not None:
+            keys_key = f"qa:{document_id}:keys"
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(key, ANSWER_TTL, json.dumps(result))
+            pipe.sadd(keys_key, key)
+            pipe.expire(keys_key, ANSWER_TTL)
+            await pipe.execute()
+
+    async def invalidate_answers(self, document_id: str):
+        """Drop every cached answer for a document"""
+        prefix = f"qa:{document_id}:"
+        for key in [k for k in self.answers if k.startswith(prefix)]:
+            del self.answers[key]
+        if self.redis is not None:
+            keys_key = f"{prefix}keys"
+            keys = await self.redis.smembers(keys_key)
+            await self.redis.delete(keys_key, *keys)
+
+    def _remember_answer(self, key: str, result: Dict[str, Any]):
+        # Local copies expire with the Redis entry
+        self.answers[key] = (time.monotonic() + ANSWER_TTL, dict(result))
+        self.answers.move_to_end(key)
+        while len(self.answers) > ANSWER_CACHE_SIZE:
+            self.answers.popitem(last=False)
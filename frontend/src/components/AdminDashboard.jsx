@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback, useContext } from 'react';
+import React, { useState, useEffect, useCallback, useContext, useRef } from 'react';
 import apiService from '../services/api-service';
 import '../styles/App.css';
 import logo from '../assets/logo.png';
@@ -12,6 +12,8 @@ const AdminDashboard = ({ user, onBackToChat, onLogout, onActiveDocumentChange})
   const [demoIngestState, setDemoIngestState] = useState({ status: null, messages: [] });
   const [demoIngested, setDemoIngested] = useState(false);
   const [dragActive, setDragActive] = useState(false);
+  // taskId -> function that stops watching that task (event stream or poll)
+  const statusWatchers = useRef(new Map());
   const formattedLoginTime = loginTime
     ? new Date(loginTime).toLocaleString()
     : "Unknown";
@@ -27,6 +29,15 @@ const AdminDashboard = ({ user, onBackToChat, onLogout, onActiveDocumentChange})
     loadUploadedFiles();
   }, []);
 
+  // Stop watching processing status when leaving the dashboard
+  useEffect(() => {
+    const watchers = statusWatchers.current;
+    return () => {
+      watchers.forEach(stop => stop());
+      watchers.clear();
+    };
+  }, []);
+
   // Load persisted demo ingestion flag on mount
   useEffect(() => {
     const ingestedFlag = localStorage.getItem("demoFilesIngested");
@@ -176,42 +187,67 @@ const AdminDashboard = ({ user, onBackToChat, onLogout, onActiveDocumentChange})
   };
 
   const monitorProcessing = async (taskId, filename) => {
-    const pollInterval = setInterval(async () => {
-      try {
-        const status = await apiService.getProcessingStatus(taskId);
-        setUploadProgress(prev => ({
-          ...prev,
-          [filename]: {
-            progress: status?.progress ?? 0,
-            status: status?.status ?? 'unknown',
-            message: status?.message ?? '',
-          }
-        }));
+    let finished = false;
 
-        if (status?.status === 'completed' || status?.status === 'error') {
-          clearInterval(pollInterval);
+    // Returns true once processing has finished
+    const handleStatus = async (status) => {
+      setUploadProgress(prev => ({
+        ...prev,
+        [filename]: {
+          progress: status?.progress ?? 0,
+          status: status?.status ?? 'unknown',
+          message: status?.message ?? '',
+        }
+      }));
 
-          if (status.status === 'completed') {
-            await loadUploadedFiles();
+      if (status?.status === 'completed' || status?.status === 'error') {
+        if (finished) return true;
+        finished = true;
+        statusWatchers.current.delete(taskId);
 
-            setTimeout(() => {
-              setUploadProgress(prev => {
-                const newState = { ...prev };
-                delete newState[filename];
-                return newState;
-              });
-            }, 3000);
-          }
+        if (status.status === 'completed') {
+          await loadUploadedFiles();
+
+          setTimeout(() => {
+            setUploadProgress(prev => {
+              const newState = { ...prev };
+              delete newState[filename];
+              return newState;
+            });
+          }, 3000);
         }
-      } catch (error) {
-        console.error('Error monitoring processing:', error);
-        clearInterval(pollInterval);
-        setUploadProgress(prev => ({
-          ...prev,
-          [filename]: { progress: 0, status: 'error', error: 'Processing failed' }
-        }));
+        return true;
       }
-    }, 2000);
+      return false;
+    };
+
+    const handleError = (error) => {
+      console.error('Error monitoring processing:', error);
+      setUploadProgress(prev => ({
+        ...prev,
+        [filename]: { progress: 0, status: 'error', error: 'Processing failed' }
+      }));
+    };
+
+    // Fall back to polling if the event stream is unavailable
+    const pollStatus = () => {
+      const pollInterval = setInterval(async () => {
+        try {
+          const status = await apiService.getProcessingStatus(taskId);
+          if (await handleStatus(status)) clearInterval(pollInterval);
+        } catch (error) {
+          clearInterval(pollInterval);
+          statusWatchers.current.delete(taskId);
+          handleError(error);
+        }
+      }, 2000);
+      statusWatchers.current.set(taskId, () => clearInterval(pollInterval));
+    };
+
+    const stopStream = apiService.watchProcessingStatus(taskId, handleStatus, () => {
+      if (!finished) pollStatus();
+    });
+    if (!finished) statusWatchers.current.set(taskId, stopStream);
   };
 
   const handleSetActive = async (activeIdx) => {
@@ -96,6 +96,24 @@ class ApiService {
     return await response.json();
   }
 
+  // Subscribe to processing status updates (Server-Sent Events).
+  // Returns a function that closes the stream.
+  watchProcessingStatus(taskId, onUpdate, onError) {
+    const source = new EventSource(`${API_BASE_URL}/api/documents/processing-status/${taskId}/stream`);
+    source.onmessage = (event) => {
+      const status = JSON.parse(event.data);
+      onUpdate(status);
+      if (status.status === 'completed' || status.status === 'error') source.close();
+    };
+    source.onerror = (event) => {
+      // Also fires when the server ends the stream after the final event;
+      // callers ignore it once they have seen a final status
+      source.close();
+      onError && onError(event);
+    };
+    return () => source.close();
+  }
+
   async listDocuments() {
     const response = await fetch(`${API_BASE_URL}/api/documents/list`, {
       headers: { 'Authorization': `Bearer ${this.token}` }